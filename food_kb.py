@@ -0,0 +1,290 @@
+# food_kb.py
+"""
+Diet knowledge base loading.
+
+diet_kb.json is the source of truth. It is compiled into a compact columnar file (diet_kb.bin):
+float32 nutrient arrays, dictionary-encoded course/state/region, NUL-joined UTF-8 strings and
+precomputed medical-tag / non-veg flags. The compiled file is memory-mapped, and the decoded
+DataFrame is cached per process until either file changes.
+
+    python food_kb.py build                 # diet_kb.json -> diet_kb.bin
+    python food_kb.py build my_kb.json --out my_kb.bin
+"""
+import os
+import re
+import json
+import hashlib
+import argparse
+import tempfile
+from typing import Dict, Any, Optional
+
+import numpy as np
+import pandas as pd
+
+
+MAGIC = b"NUTRIKB1"
+ALIGN = 64
+FORMAT_VERSION = 1
+
+NUMERIC_COLUMNS = ["Protein (g)", "Total Fat (g)", "Carbohydrate (g)", "Energy (kcal)", "Fiber (g)"]
+# Decimals kept for nutrients once loaded; also hides float32 noise (10.020539283752441) in prompts
+NUMERIC_PRECISION = 4
+CATEGORY_COLUMNS = ["course", "state", "region"]
+
+# Bit order matches the order tags were always listed in
+MEDICAL_TAGS = ["diabetic_friendly", "low_sugar", "high_protein", "low_fat", "renal_safe"]
+TAG_BITS = {tag: 1 << i for i, tag in enumerate(MEDICAL_TAGS)}
+
+NON_VEG_KEYWORDS = ["fish", "chicken", "mutton", "lamb", "pork", "egg", "prawn", "shrimp",
+                    "crab", "lobster", "meat", "beef", "goat", "duck", "turkey", "bacon",
+                    "sausage", "ham", "sardine", "tuna", "salmon", "mackerel", "hilsa", "rohu"]
+_NON_VEG_PATTERN = "|".join(re.escape(k) for k in NON_VEG_KEYWORDS)
+
+# Derived columns that are used for filtering only and shouldn't reach the LLM prompt
+INTERNAL_COLUMNS = ["tag_mask", "is_non_veg"]
+
+
+# =========================
+# 1. TAGGING
+# =========================
+def compute_tag_mask(df: pd.DataFrame) -> np.ndarray:
+    carbs = df["Carbohydrate (g)"].to_numpy(dtype=np.float64)
+    protein = df["Protein (g)"].to_numpy(dtype=np.float64)
+    fat = df["Total Fat (g)"].to_numpy(dtype=np.float64)
+    has_sugar = df["ingredients"].astype(str).str.lower().str.contains("sugar", regex=False).to_numpy()
+
+    mask = np.zeros(len(df), dtype=np.uint8)
+    low_carb = (carbs < 30) & ~has_sugar
+    mask[low_carb] |= TAG_BITS["diabetic_friendly"] | TAG_BITS["low_sugar"]
+    mask[protein > 10] |= TAG_BITS["high_protein"]
+    mask[fat < 8] |= TAG_BITS["low_fat"]
+    mask[(protein > 5) & (protein < 15)] |= TAG_BITS["renal_safe"]
+    return mask
+
+
+def compute_non_veg(df: pd.DataFrame) -> np.ndarray:
+    # Non-string ingredients (missing data) count as vegetarian, as before
+    return df["ingredients"].str.lower().str.contains(_NON_VEG_PATTERN, regex=True, na=False).to_numpy(dtype=bool)
+
+
+def tags_from_mask(mask: np.ndarray) -> pd.Series:
+    lookup = {m: [tag for tag in MEDICAL_TAGS if m & TAG_BITS[tag]] for m in np.unique(mask).tolist()}
+    return pd.Series([lookup[m] for m in mask.tolist()])
+
+
+def add_derived_columns(df: pd.DataFrame, tag_mask: np.ndarray, non_veg: np.ndarray) -> pd.DataFrame:
+    df["tag_mask"] = tag_mask
+    df["is_non_veg"] = non_veg
+    df["medical_tags"] = tags_from_mask(tag_mask).values
+    return df
+
+
+# =========================
+# 2. COMPILED FORMAT
+# =========================
+def _aligned(n: int) -> int:
+    return -(-n // ALIGN) * ALIGN
+
+
+def compiled_path_for(json_path: str) -> str:
+    return os.path.splitext(json_path)[0] + ".bin"
+
+
+def _sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def source_signature(json_path: str) -> Dict[str, Any]:
+    st = os.stat(json_path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": _sha256(json_path)}
+
+
+def compile_kb(json_path: str, out_path: Optional[str] = None) -> str:
+    """Compile the JSON knowledge base into the memory-mappable columnar file. Returns the output path."""
+    out_path = out_path or compiled_path_for(json_path)
+    with open(json_path, "r") as f:
+        df = pd.DataFrame(json.load(f))
+
+    blocks = [
+        ("tag_mask", "mask", compute_tag_mask(df), {}),
+        ("is_non_veg", "bool", compute_non_veg(df).astype(np.uint8), {}),
+    ]
+    for col in df.columns:
+        if col in NUMERIC_COLUMNS or (col not in CATEGORY_COLUMNS and pd.api.types.is_numeric_dtype(df[col])):
+            blocks.append((col, "numeric", df[col].to_numpy(dtype=np.float32), {}))
+        elif col in CATEGORY_COLUMNS:
+            codes, categories = pd.factorize(df[col], sort=True)
+            blocks.append((col, "category", codes.astype(np.int16), {"categories": categories.tolist()}))
+        else:
+            values = ["" if pd.isna(v) else str(v).replace("\x00", "") for v in df[col].tolist()]
+            blob = "\x00".join(values).encode("utf-8")
+            blocks.append((col, "string", np.frombuffer(blob, dtype=np.uint8), {}))
+
+    # Column offsets are relative to the data section, which starts at the first 64-byte boundary after the header
+    columns = []
+    offset = 0
+    for name, kind, arr, extra in blocks:
+        columns.append(dict(name=name, kind=kind, dtype=arr.dtype.str, offset=offset, nbytes=arr.nbytes, **extra))
+        offset += _aligned(arr.nbytes)
+    header = {
+        "version": FORMAT_VERSION,
+        "rows": len(df),
+        "source": source_signature(json_path),
+        "column_order": list(df.columns),
+        "columns": columns,
+    }
+    header_bytes = json.dumps(header).encode("utf-8")
+    data_start = _aligned(len(MAGIC) + 8 + len(header_bytes))
+
+    # Write to a temp file and rename, so concurrent readers never see a partial file
+    out_dir = os.path.dirname(os.path.abspath(out_path))
+    fd, tmp_path = tempfile.mkstemp(dir=out_dir, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(MAGIC)
+            f.write(np.uint64(len(header_bytes)).astype("<u8").tobytes())
+            f.write(header_bytes)
+            for col, (_, _, arr, _) in zip(columns, blocks):
+                f.write(b"\x00" * (data_start + col["offset"] - f.tell()))
+                f.write(arr.tobytes())
+        os.replace(tmp_path, out_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return out_path
+
+
+def read_header(compiled_path: str):
+    mm = np.memmap(compiled_path, dtype=np.uint8, mode="r")
+    if bytes(mm[:len(MAGIC)]) != MAGIC:
+        raise ValueError(f"{compiled_path} is not a compiled diet KB")
+    header_len = int(mm[len(MAGIC):len(MAGIC) + 8].view("<u8")[0])
+    start = len(MAGIC) + 8
+    header = json.loads(bytes(mm[start:start + header_len]).decode("utf-8"))
+    if header.get("version") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported diet KB format version {header.get('version')}")
+    header["data_start"] = _aligned(start + header_len)
+    return mm, header
+
+
+def is_compiled_fresh(header: Dict[str, Any], json_path: str) -> bool:
+    """True if the compiled file was built from the current JSON (cheap size/mtime check first, then hash)."""
+    if not os.path.exists(json_path):
+        return True  # compiled file shipped on its own
+    source = header.get("source", {})
+    st = os.stat(json_path)
+    if st.st_size != source.get("size"):
+        return False
+    if st.st_mtime_ns == source.get("mtime_ns"):
+        return True
+    return _sha256(json_path) == source.get("sha256")
+
+
+def load_compiled(mm: np.memmap, header: Dict[str, Any]) -> pd.DataFrame:
+    rows = header["rows"]
+    data = {}
+    derived = {}
+    for col in header["columns"]:
+        begin = header["data_start"] + col["offset"]
+        arr = mm[begin:begin + col["nbytes"]].view(np.dtype(col["dtype"]))
+        if col["kind"] == "numeric":
+            data[col["name"]] = np.round(arr.astype(np.float64), NUMERIC_PRECISION)
+        elif col["kind"] == "category":
+            data[col["name"]] = pd.Categorical.from_codes(arr, categories=col["categories"])
+        elif col["kind"] == "string":
+            data[col["name"]] = bytes(arr).decode("utf-8").split("\x00") if rows else []
+        else:
+            derived[col["name"]] = np.asarray(arr)
+
+    df = pd.DataFrame({name: data[name] for name in header["column_order"]})
+    return add_derived_columns(df, derived["tag_mask"], derived["is_non_veg"].astype(bool))
+
+
+def load_json(json_path: str) -> pd.DataFrame:
+    with open(json_path, "r") as f:
+        df = pd.DataFrame(json.load(f))
+    # Tag from the full-precision values, then round like the compiled path
+    df = add_derived_columns(df, compute_tag_mask(df), compute_non_veg(df))
+    numeric = [c for c in NUMERIC_COLUMNS if c in df.columns]
+    df[numeric] = df[numeric].round(NUMERIC_PRECISION)
+    return df
+
+
+# filepath -> ((compiled stat, json stat), DataFrame); the KB is loaded once per process until a file changes
+_KB_CACHE = {}
+
+
+def _file_stat(path: str):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def _load_uncached(compiled_path: str, json_path: str) -> pd.DataFrame:
+    if os.path.exists(compiled_path):
+        try:
+            mm, header = read_header(compiled_path)
+            if is_compiled_fresh(header, json_path):
+                df = load_compiled(mm, header)
+                if os.path.exists(json_path) and _file_stat(json_path)[0] != header["source"].get("mtime_ns"):
+                    # Same content, new mtime (checkout, copy, touch): restamp so the next check skips the hash
+                    try:
+                        compile_kb(json_path, compiled_path)
+                    except OSError:
+                        pass
+                return df
+        except (ValueError, KeyError, OSError):
+            pass  # unreadable or old format: fall back to the JSON and rebuild
+
+    if not os.path.exists(json_path):
+        return pd.DataFrame()
+
+    df = load_json(json_path)
+    try:
+        compile_kb(json_path, compiled_path)
+    except OSError:
+        pass  # read-only deploy: keep serving from the JSON
+    return df
+
+
+def load_and_tag_data(filepath):
+    """Load the KB as a tagged DataFrame, preferring the compiled file when it matches the JSON.
+
+    The result is cached per process and shared between callers, so treat it as read-only.
+    """
+    compiled_path = filepath if filepath.endswith(".bin") else compiled_path_for(filepath)
+    json_path = filepath if not filepath.endswith(".bin") else os.path.splitext(filepath)[0] + ".json"
+
+    cached = _KB_CACHE.get(filepath)
+    if cached is not None and cached[0] == (_file_stat(compiled_path), _file_stat(json_path)):
+        return cached[1]
+
+    df = _load_uncached(compiled_path, json_path)
+    # Stat after loading, since the load may have (re)built the compiled file
+    _KB_CACHE[filepath] = ((_file_stat(compiled_path), _file_stat(json_path)), df)
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile the diet knowledge base")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="Compile a JSON KB into the columnar binary format")
+    build.add_argument("source", nargs="?", default="diet_kb.json")
+    build.add_argument("--out", default=None)
+    args = parser.parse_args()
+
+    out_path = compile_kb(args.source, args.out)
+    _, header = read_header(out_path)
+    print(f"Compiled {header['rows']} dishes: {args.source} ({os.path.getsize(args.source)} bytes) "
+          f"-> {out_path} ({os.path.getsize(out_path)} bytes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,479 @@
+# loadtest.py
+"""
+Concurrency load test for /plan-diet and /plan-diet-manual.
+
+Starts a fake Gemini server with configurable latency/errors, starts the API against it
+(uvicorn, LOOP_LAG_PROBE=1) and drives mixed PDF + manual traffic at increasing concurrency.
+
+    python loadtest.py run --label 1worker --workers 1 --concurrency 1,4,16,32
+    python loadtest.py run --label 4workers --workers 4 --latency lognormal:1.5:0.4 --rate-limit 0.05
+    python loadtest.py compare loadtest_results/*.json
+    python loadtest.py fake-gemini --port 8787 --latency uniform:0.5:2.0   # stand-alone fake
+"""
+import os
+import sys
+import io
+import json
+import time
+import random
+import asyncio
+import argparse
+import subprocess
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+import httpx
+
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(BASE_DIR, "loadtest_results")
+
+
+# =========================
+# 1. FAKE GEMINI SERVER
+# =========================
+FAKE_DISHES = {
+    "breakfast": ["Idli Sambhar", "Vegetable Poha", "Rava Upma", "Methi Paratha with Curd", "Oats porridge with skim milk",
+                  "Moong Dal Chilla", "Ragi Dosa with Chutney", "Vegetable Dalia"],
+    "lunch": ["2 Rotis with Dal and Bhindi Sabzi", "Brown Rice with Rajma and Salad", "Jowar Roti with Palak Paneer",
+              "Curd Rice with Cucumber Salad", "Millet Khichdi with Kadhi", "Chicken Curry with 2 Phulkas"],
+    "dinner": ["Moong Dal Khichdi", "Tomato Soup with Multigrain Bread", "Lauki Chana Dal with Roti",
+               "Vegetable Daliya", "Grilled Fish with Sauteed Vegetables", "Mixed Vegetable Soup"],
+    "snacks": ["Roasted Chana", "Fruit Chaat", "Buttermilk", "Sprouted Moong Salad", "Makhana", "Cucumber Raita"],
+}
+
+
+def parse_latency(spec: str):
+    """Build a sampler (seconds) from 'fixed:S', 'uniform:LO:HI', 'normal:MEAN:STD' or 'lognormal:MEDIAN:SIGMA'."""
+    kind, *params = spec.split(":")
+    vals = [float(p) for p in params]
+    if kind == "fixed" and len(vals) == 1:
+        return lambda rng: vals[0]
+    if kind == "uniform" and len(vals) == 2:
+        return lambda rng: rng.uniform(vals[0], vals[1])
+    if kind == "normal" and len(vals) == 2:
+        return lambda rng: max(0.0, rng.gauss(vals[0], vals[1]))
+    if kind == "lognormal" and len(vals) == 2:
+        import math
+        mu = math.log(vals[0])
+        return lambda rng: rng.lognormvariate(mu, vals[1])
+    raise ValueError(f"Bad latency spec: {spec!r}")
+
+
+def fake_day_plan(rng: random.Random) -> Dict[str, Any]:
+    plan = {}
+    for meal, dishes in FAKE_DISHES.items():
+        plan[meal] = [
+            {
+                "item": name,
+                "calories": rng.randint(120, 550),
+                "protein": rng.randint(3, 30),
+                "fat": rng.randint(2, 20),
+                "carbs": rng.randint(10, 80),
+                "tags": ["diabetic_friendly"],
+                "ingredients": [],
+                "origin": "North",
+            }
+            for name in rng.sample(dishes, rng.randint(1, 2))
+        ]
+    return plan
+
+
+def create_fake_gemini_app(latency: str, error_rate: float, rate_limit: float, seed: Optional[int] = None):
+    from fastapi import FastAPI
+    from fastapi.responses import JSONResponse
+
+    sample_latency = parse_latency(latency)
+    rng = random.Random(seed)
+    counters = {"calls": 0, "ok": 0, "errors": 0, "rate_limited": 0}
+    fake = FastAPI(title="Fake Gemini")
+
+    @fake.post("/{api_version}/models/{model_action:path}")
+    async def generate_content(api_version: str, model_action: str):
+        counters["calls"] += 1
+        await asyncio.sleep(sample_latency(rng))
+
+        roll = rng.random()
+        if roll < rate_limit:
+            counters["rate_limited"] += 1
+            return JSONResponse(status_code=429, content={
+                "error": {"code": 429, "message": "Resource has been exhausted (e.g. check quota).", "status": "RESOURCE_EXHAUSTED"}
+            })
+        if roll < rate_limit + error_rate:
+            counters["errors"] += 1
+            return JSONResponse(status_code=500, content={
+                "error": {"code": 500, "message": "An internal error has occurred.", "status": "INTERNAL"}
+            })
+
+        counters["ok"] += 1
+        return {
+            "candidates": [{
+                "content": {"role": "model", "parts": [{"text": json.dumps(fake_day_plan(rng))}]},
+                "finishReason": "STOP",
+                "index": 0,
+            }],
+            "modelVersion": model_action.split(":")[0],
+        }
+
+    @fake.get("/stats")
+    async def stats(reset: bool = False):
+        snapshot = dict(counters)
+        if reset:
+            for key in counters:
+                counters[key] = 0
+        return snapshot
+
+    return fake
+
+
+# =========================
+# 2. TRAFFIC
+# =========================
+REPORT_LINES = [
+    "CITY DIAGNOSTICS LABORATORY - BIOCHEMISTRY REPORT",
+    "Age / Gender : {age} years / {gender}",
+    "Glucose fasting {glucose} mg/dL",
+    "Creatinine, Serum {creatinine} mg/dL",
+    "UREA {urea} mg/dL",
+    "SODIUM {sodium} mmol/L",
+    "POTASSIUM {potassium} mmol/L",
+    "Haemoglobin {hemoglobin} g/dL",
+    "Cholesterol-Total {cholesterol} mg/dL",
+    "Glyco Hb (HbA1C) {hba1c} %",
+]
+
+
+def random_biomarkers(rng: random.Random) -> Dict[str, Any]:
+    return {
+        "glucose": round(rng.uniform(80, 220)),
+        "creatinine": round(rng.uniform(0.6, 2.5), 1),
+        "urea_bun": round(rng.uniform(10, 45)),
+        "sodium": round(rng.uniform(132, 146)),
+        "potassium": round(rng.uniform(3.4, 5.4), 1),
+        "cholesterol": round(rng.uniform(140, 260)),
+        "age": rng.randint(25, 80),
+        "gender": rng.choice(["Male", "Female"]),
+        "hemoglobin": round(rng.uniform(10, 16), 1),
+        "hba1c": round(rng.uniform(5.0, 9.0), 1),
+    }
+
+
+def build_report_pdf(markers: Dict[str, Any]) -> bytes:
+    """Minimal single-page text PDF that pdfplumber can read without the OCR fallback."""
+    lines = [line.format(urea=markers["urea_bun"], **markers) for line in REPORT_LINES]
+    text_ops = ["BT", "/F1 11 Tf", "14 TL", "50 790 Td"]
+    for line in lines:
+        escaped = line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+        text_ops.append(f"({escaped}) Tj T*")
+    text_ops.append("ET")
+    stream = "\n".join(text_ops).encode("latin-1")
+
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Contents 4 0 R /Resources << /Font << /F1 5 0 R >> >> >>",
+        b"<< /Length " + str(len(stream)).encode() + b" >>\nstream\n" + stream + b"\nendstream",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for num, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(f"{num} 0 obj\n".encode() + body + b"\nendobj\n")
+    xref_at = out.tell()
+    out.write(f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode())
+    for offset in offsets:
+        out.write(f"{offset:010d} 00000 n \n".encode())
+    out.write(f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref_at}\n%%EOF\n".encode())
+    return out.getvalue()
+
+
+def build_traffic_pool(rng: random.Random, size: int, repeat_ratio: float, pdf_path: Optional[str]):
+    """Pre-build request bodies so payload generation doesn't show up in client-side latency."""
+    manual, pdfs = [], []
+    for _ in range(size):
+        if manual and rng.random() < repeat_ratio:
+            markers = dict(rng.choice(manual))
+        else:
+            markers = random_biomarkers(rng)
+            markers["preferences"] = {
+                "diet_type": rng.choice(["vegetarian", "non-vegetarian", "both"]),
+                "region": rng.choice([None, "North", "South", "East", "West"]),
+            }
+        manual.append(markers)
+        if not pdf_path:
+            pdfs.append(build_report_pdf(markers))
+    if pdf_path:
+        with open(pdf_path, "rb") as f:
+            pdfs = [f.read()]
+    return manual, pdfs
+
+
+# =========================
+# 3. DRIVER
+# =========================
+def percentile(sorted_vals: List[float], q: float) -> float:
+    if not sorted_vals:
+        return 0.0
+    return sorted_vals[min(len(sorted_vals) - 1, int(q * len(sorted_vals)))]
+
+
+def summarize_latencies(latencies: List[float]) -> Dict[str, float]:
+    vals = sorted(latencies)
+    return {
+        "count": len(vals),
+        "p50_ms": round(percentile(vals, 0.50) * 1000, 1),
+        "p90_ms": round(percentile(vals, 0.90) * 1000, 1),
+        "p99_ms": round(percentile(vals, 0.99) * 1000, 1),
+        "max_ms": round(vals[-1] * 1000, 1) if vals else 0.0,
+    }
+
+
+async def collect_worker_stats(client: httpx.AsyncClient, api_url: str, workers: int, reset: bool) -> Dict[str, Any]:
+    """Poll the probe endpoint until every worker process has answered (or we give up)."""
+    per_worker = {}
+    for _ in range(max(8, workers * 8)):
+        try:
+            r = await client.get(f"{api_url}/_probe/stats", params={"reset": reset}, timeout=30)
+            stats = r.json()
+            per_worker.setdefault(str(stats["pid"]), stats)
+        except (httpx.HTTPError, ValueError, KeyError):
+            pass
+        if len(per_worker) >= workers:
+            break
+    return per_worker
+
+
+async def run_stage(api_url: str, fake_url: str, concurrency: int, duration: float, pdf_ratio: float,
+                    manual_pool, pdf_pool, workers: int, rng: random.Random, timeout: float) -> Dict[str, Any]:
+    results = []
+    limits = httpx.Limits(max_connections=concurrency + 4, max_keepalive_connections=concurrency + 4)
+    async with httpx.AsyncClient(timeout=timeout, limits=limits) as client:
+        await collect_worker_stats(client, api_url, workers, reset=True)
+        await client.get(f"{fake_url}/stats", params={"reset": True})
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + duration
+
+        async def worker():
+            while loop.time() < deadline:
+                kind = "pdf" if rng.random() < pdf_ratio else "manual"
+                markers = rng.choice(manual_pool)
+                start = time.perf_counter()
+                try:
+                    if kind == "pdf":
+                        prefs = markers["preferences"]
+                        params = {"diet_type": prefs["diet_type"]}
+                        if prefs["region"]:
+                            params["region"] = prefs["region"]
+                        r = await client.post(
+                            f"{api_url}/plan-diet",
+                            params=params,
+                            files={"report": ("report.pdf", rng.choice(pdf_pool), "application/pdf")},
+                        )
+                    else:
+                        r = await client.post(f"{api_url}/plan-diet-manual", json=markers)
+                    status = r.status_code
+                except httpx.HTTPError:
+                    status = 0  # transport error / timeout
+                results.append((kind, status, time.perf_counter() - start))
+
+        stage_start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        wall = time.perf_counter() - stage_start
+
+        worker_stats = await collect_worker_stats(client, api_url, workers, reset=False)
+        upstream = (await client.get(f"{fake_url}/stats")).json()
+
+    ok = [lat for _, status, lat in results if status == 200]
+    status_counts = {}
+    for _, status, _ in results:
+        status_counts[str(status)] = status_counts.get(str(status), 0) + 1
+
+    return {
+        "concurrency": concurrency,
+        "wall_s": round(wall, 2),
+        "requests": len(results),
+        "ok": len(ok),
+        "error_rate": round(1 - len(ok) / len(results), 4) if results else 0.0,
+        "status_counts": status_counts,
+        "throughput_rps": round(len(ok) / wall, 3) if wall else 0.0,
+        "latency": summarize_latencies(ok),
+        "latency_by_kind": {
+            kind: summarize_latencies([lat for k, status, lat in results if k == kind and status == 200])
+            for kind in ("pdf", "manual")
+        },
+        "workers": worker_stats,
+        "upstream": upstream,
+    }
+
+
+def wait_for_http(url: str, timeout: float, proc: Optional[subprocess.Popen] = None):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc is not None and proc.poll() is not None:
+            raise RuntimeError(f"Process exited early with code {proc.returncode} while waiting for {url}")
+        try:
+            httpx.get(url, timeout=2)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.5)
+    raise TimeoutError(f"Timed out waiting for {url}")
+
+
+def print_stage(stage: Dict[str, Any]):
+    lat = stage["latency"]
+    lags = [w["loop_lag_ms"]["max"] for w in stage["workers"].values()]
+    rss = [w["rss_mb"] for w in stage["workers"].values()]
+    print(
+        f"  c={stage['concurrency']:<4} req={stage['requests']:<5} rps={stage['throughput_rps']:<7} "
+        f"p50={lat['p50_ms']:<8} p99={lat['p99_ms']:<8} err={stage['error_rate']:<6.2%} "
+        f"loop_lag_max={max(lags) if lags else 0:<8} rss_mb={max(rss) if rss else 0:<7} "
+        f"upstream_calls={stage['upstream'].get('calls', 0)}"
+    )
+
+
+def cmd_run(args):
+    concurrency_levels = [int(c) for c in args.concurrency.split(",")]
+    rng = random.Random(args.seed)
+    manual_pool, pdf_pool = build_traffic_pool(rng, args.pool_size, args.repeat_ratio, args.pdf)
+
+    fake_url = f"http://127.0.0.1:{args.fake_port}"
+    api_url = f"http://127.0.0.1:{args.port}"
+    procs = []
+    try:
+        fake_cmd = [
+            sys.executable, os.path.abspath(__file__), "fake-gemini",
+            "--port", str(args.fake_port), "--latency", args.latency,
+            "--error-rate", str(args.error_rate), "--rate-limit", str(args.rate_limit),
+        ]
+        procs.append(subprocess.Popen(fake_cmd, cwd=BASE_DIR))
+        wait_for_http(f"{fake_url}/stats", 30, procs[-1])
+
+        env = dict(os.environ, GEMINI_BASE_URL=fake_url, GEMINI_API_KEY="loadtest", LOOP_LAG_PROBE="1")
+        api_cmd = [
+            sys.executable, "-m", "uvicorn", "main:app",
+            "--host", "127.0.0.1", "--port", str(args.port),
+            "--workers", str(args.workers), "--log-level", "warning",
+        ] + args.uvicorn_arg
+        procs.append(subprocess.Popen(api_cmd, cwd=BASE_DIR, env=env))
+        wait_for_http(f"{api_url}/_probe/stats", args.startup_timeout, procs[-1])
+
+        print(f"[{args.label}] workers={args.workers} latency={args.latency} "
+              f"error_rate={args.error_rate} rate_limit={args.rate_limit}")
+        stages = []
+        for concurrency in concurrency_levels:
+            stage = asyncio.run(run_stage(
+                api_url, fake_url, concurrency, args.duration, args.pdf_ratio,
+                manual_pool, pdf_pool, args.workers, rng, args.timeout,
+            ))
+            print_stage(stage)
+            stages.append(stage)
+    finally:
+        for proc in reversed(procs):
+            proc.terminate()
+            try:
+                proc.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+    result = {
+        "label": args.label,
+        "started_at": datetime.now().isoformat(timespec="seconds"),
+        "config": {
+            "workers": args.workers,
+            "uvicorn_args": args.uvicorn_arg,
+            "latency": args.latency,
+            "error_rate": args.error_rate,
+            "rate_limit": args.rate_limit,
+            "pdf_ratio": args.pdf_ratio,
+            "repeat_ratio": args.repeat_ratio,
+            "duration_s": args.duration,
+            "seed": args.seed,
+        },
+        "stages": stages,
+    }
+    os.makedirs(args.out_dir, exist_ok=True)
+    out_path = os.path.join(args.out_dir, f"{args.label}-{datetime.now():%Y%m%d-%H%M%S}.json")
+    with open(out_path, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"Saved {out_path}")
+
+
+def cmd_compare(args):
+    runs = []
+    for path in args.files:
+        with open(path) as f:
+            runs.append(json.load(f))
+
+    levels = sorted({stage["concurrency"] for run in runs for stage in run["stages"]})
+    header = f"{'concurrency':<12}{'label':<24}{'rps':>9}{'p50_ms':>10}{'p99_ms':>10}{'err':>8}{'lag_max_ms':>12}{'rss_mb':>9}"
+    print(header)
+    print("-" * len(header))
+    for level in levels:
+        for run in runs:
+            for stage in run["stages"]:
+                if stage["concurrency"] != level:
+                    continue
+                lags = [w["loop_lag_ms"]["max"] for w in stage["workers"].values()] or [0]
+                rss = [w["rss_mb"] for w in stage["workers"].values()] or [0]
+                print(
+                    f"{level:<12}{run['label'][:23]:<24}{stage['throughput_rps']:>9}"
+                    f"{stage['latency']['p50_ms']:>10}{stage['latency']['p99_ms']:>10}"
+                    f"{stage['error_rate']:>8.2%}{max(lags):>12}{max(rss):>9}"
+                )
+
+
+def cmd_fake_gemini(args):
+    import uvicorn
+    app = create_fake_gemini_app(args.latency, args.error_rate, args.rate_limit, args.seed)
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+def add_fake_args(parser):
+    parser.add_argument("--latency", default="lognormal:1.2:0.35",
+                        help="fixed:S | uniform:LO:HI | normal:MEAN:STD | lognormal:MEDIAN:SIGMA (seconds)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of calls answered with HTTP 500")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="Fraction of calls answered with HTTP 429")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AI-NutriCare load test")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="Start fake Gemini + API and run the concurrency sweep")
+    run.add_argument("--label", required=True, help="Name for this serving configuration")
+    run.add_argument("--workers", type=int, default=1)
+    run.add_argument("--uvicorn-arg", action="append", default=[], help="Extra uvicorn argument (repeatable)")
+    run.add_argument("--concurrency", default="1,2,4,8,16")
+    run.add_argument("--duration", type=float, default=30.0, help="Seconds per concurrency level")
+    run.add_argument("--pdf-ratio", type=float, default=0.3, help="Fraction of requests sent to /plan-diet")
+    run.add_argument("--repeat-ratio", type=float, default=0.3, help="Fraction of manual payloads that repeat an earlier one")
+    run.add_argument("--pool-size", type=int, default=200)
+    run.add_argument("--pdf", help="Use this PDF for every /plan-diet call instead of generated reports")
+    run.add_argument("--port", type=int, default=8000)
+    run.add_argument("--fake-port", type=int, default=8787)
+    run.add_argument("--timeout", type=float, default=120.0, help="Per-request client timeout")
+    run.add_argument("--startup-timeout", type=float, default=180.0)
+    run.add_argument("--seed", type=int, default=42)
+    run.add_argument("--out-dir", default=RESULTS_DIR)
+    add_fake_args(run)
+    run.set_defaults(func=cmd_run)
+
+    compare = sub.add_parser("compare", help="Compare saved runs side by side")
+    compare.add_argument("files", nargs="+")
+    compare.set_defaults(func=cmd_compare)
+
+    fake = sub.add_parser("fake-gemini", help="Run only the fake Gemini server")
+    fake.add_argument("--port", type=int, default=8787)
+    fake.add_argument("--seed", type=int, default=None)
+    add_fake_args(fake)
+    fake.set_defaults(func=cmd_fake_gemini)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
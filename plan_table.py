@@ -0,0 +1,117 @@
+# plan_table.py
+"""
+Array-backed representation of a generated week plan.
+
+Every dish is one row of a (n_items, 4) float table of calories/protein/fat/carbs, with day and
+meal index columns next to it. Rounding, the weekly average and the per-day / per-meal totals
+all come from that table in one vectorized pass instead of nested loops over day/meal/item dicts.
+"""
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+
+
+MEAL_TYPES = ("breakfast", "lunch", "dinner", "snacks")
+NUTRIENTS = ("calories", "protein", "fat", "carbs")
+
+
+def _to_number(val) -> float:
+    if isinstance(val, bool):
+        return 0.0
+    try:
+        num = float(val)
+    except (TypeError, ValueError):
+        return 0.0
+    return num if np.isfinite(num) else 0.0
+
+
+def _clean_item(item: Dict[str, Any]) -> Dict[str, Any]:
+    meta = {k: v for k, v in item.items() if k not in NUTRIENTS}
+    meta["item"] = str(meta.get("item", "")).strip()
+    for key in ("tags", "ingredients"):
+        if key in meta and not isinstance(meta[key], list):
+            meta[key] = [meta[key]] if meta[key] else []
+    meta.setdefault("tags", [])
+    return meta
+
+
+class WeekPlan:
+    """Validated week x meal x item nutrition table plus the plan's non-numeric fields."""
+
+    __slots__ = ("n_days", "items", "values", "day_idx", "meal_idx", "medical_reasoning")
+
+    def __init__(self, n_days: int, items: List[Dict[str, Any]], values: np.ndarray,
+                 day_idx: np.ndarray, meal_idx: np.ndarray, medical_reasoning: str = ""):
+        self.n_days = n_days
+        self.items = items
+        self.values = values
+        self.day_idx = day_idx
+        self.meal_idx = meal_idx
+        self.medical_reasoning = medical_reasoning
+
+    @classmethod
+    def from_days(cls, day_plans: List[Dict[str, Any]], medical_reasoning: str = "") -> "WeekPlan":
+        """Build the table from raw single-day LLM output, dropping anything that isn't a named dish."""
+        items, rows, day_idx, meal_idx = [], [], [], []
+        for d, day_plan in enumerate(day_plans):
+            if not isinstance(day_plan, dict):
+                continue
+            for m, meal in enumerate(MEAL_TYPES):
+                dishes = day_plan.get(meal) or []
+                if not isinstance(dishes, list):
+                    continue
+                for dish in dishes:
+                    if not isinstance(dish, dict) or not str(dish.get("item", "")).strip():
+                        continue
+                    items.append(_clean_item(dish))
+                    rows.append([_to_number(dish.get(k)) for k in NUTRIENTS])
+                    day_idx.append(d)
+                    meal_idx.append(m)
+
+        return cls(
+            n_days=len(day_plans),
+            items=items,
+            values=np.array(rows, dtype=np.float64).reshape(-1, len(NUTRIENTS)),
+            day_idx=np.array(day_idx, dtype=np.intp),
+            meal_idx=np.array(meal_idx, dtype=np.intp),
+            medical_reasoning=medical_reasoning,
+        )
+
+    def meal_totals(self) -> np.ndarray:
+        """(n_days, n_meals, n_nutrients) sums."""
+        totals = np.zeros((self.n_days, len(MEAL_TYPES), len(NUTRIENTS)))
+        np.add.at(totals, (self.day_idx, self.meal_idx), self.values)
+        return totals
+
+    def to_dict(self, ndigits: Optional[int] = None) -> Dict[str, Any]:
+        """Serialize to the API response shape, rounding every number to `ndigits` if given."""
+        meal_totals = self.meal_totals()
+        day_totals = meal_totals.sum(axis=1)
+        # Weekly average per day, kept at 1 decimal like the original summary
+        average = np.round(day_totals.sum(axis=0) / max(self.n_days, 1), 1)
+
+        values = self.values
+        if ndigits is not None:
+            values = np.round(values, ndigits)
+            meal_totals = np.round(meal_totals, ndigits)
+            day_totals = np.round(day_totals, ndigits)
+            average = np.round(average, ndigits)
+
+        week_plan = {f"day{d + 1}": {meal: [] for meal in MEAL_TYPES} for d in range(self.n_days)}
+        for meta, row, d, m in zip(self.items, values.tolist(), self.day_idx.tolist(), self.meal_idx.tolist()):
+            dish = dict(meta)
+            dish.update(zip(NUTRIENTS, row))
+            week_plan[f"day{d + 1}"][MEAL_TYPES[m]].append(dish)
+
+        daily_nutrition = {}
+        for d, (day_row, meal_rows) in enumerate(zip(day_totals.tolist(), meal_totals.tolist())):
+            summary = dict(zip(NUTRIENTS, day_row))
+            summary["meals"] = {meal: dict(zip(NUTRIENTS, meal_row)) for meal, meal_row in zip(MEAL_TYPES, meal_rows)}
+            daily_nutrition[f"day{d + 1}"] = summary
+
+        return {
+            "week_plan": week_plan,
+            "total_nutrition": dict(zip(NUTRIENTS, average.tolist())),
+            "daily_nutrition": daily_nutrition,
+            "medical_reasoning": self.medical_reasoning,
+        }
@@ -0,0 +1,50 @@
+# tests/test_food_kb.py
+import os
+import sys
+import json
+import shutil
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import food_kb
+
+
+KB_JSON = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "diet_kb.json")
+
+
+def _copy_kb(tmp_path):
+    path = str(tmp_path / "diet_kb.json")
+    shutil.copy(KB_JSON, path)
+    return path
+
+
+def test_compiled_matches_json(tmp_path):
+    path = _copy_kb(tmp_path)
+    from_json = food_kb.load_json(path)
+    food_kb.compile_kb(path)
+    compiled = food_kb.load_compiled(*food_kb.read_header(food_kb.compiled_path_for(path)))
+
+    assert compiled["name"].tolist() == from_json["name"].tolist()
+    assert compiled["medical_tags"].tolist() == from_json["medical_tags"].tolist()
+    assert compiled["is_non_veg"].tolist() == from_json["is_non_veg"].tolist()
+    # Nutrients come back at fixed precision, not as float32 noise
+    record = compiled.drop(columns=food_kb.INTERNAL_COLUMNS).to_dict(orient="records")[0]
+    assert record["Protein (g)"] == round(json.load(open(path))[0]["Protein (g)"], food_kb.NUMERIC_PRECISION)
+
+
+def test_load_is_cached_and_restamped(tmp_path, monkeypatch):
+    path = _copy_kb(tmp_path)
+    first = food_kb.load_and_tag_data(path)
+    assert os.path.exists(food_kb.compiled_path_for(path))
+    assert food_kb.load_and_tag_data(path) is first
+
+    hashes = []
+    real_sha = food_kb._sha256
+    monkeypatch.setattr(food_kb, "_sha256", lambda p: hashes.append(p) or real_sha(p))
+
+    os.utime(path)  # same content, new mtime
+    for _ in range(5):
+        df = food_kb.load_and_tag_data(path)
+    # One hash to confirm the content, one when the restamp records the new signature
+    assert len(hashes) == 2
+    assert len(df) == len(first)
@@ -0,0 +1,116 @@
+# tests/test_plan_variety.py
+import os
+import sys
+from collections import Counter
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+for _dep in ("tensorflow", "fastapi", "pdfplumber", "pdf2image", "pytesseract", "google.genai"):
+    pytest.importorskip(_dep)
+
+import main
+
+
+def _day(*dishes):
+    return {"breakfast": [{"item": d, "calories": 100, "protein": 5, "fat": 2, "carbs": 10, "tags": []} for d in dishes],
+            "lunch": [], "dinner": [], "snacks": []}
+
+
+def test_split_disjoint_when_pool_is_large():
+    windows = main.split_candidates_across_days(list(range(7 * 5)), per_day=5)
+    assert all(len(w) == 5 for w in windows)
+    assert len(set().union(*map(set, windows))) == 35
+
+
+def test_split_small_pool_overlaps_evenly():
+    windows = main.split_candidates_across_days(list(range(20)), per_day=12)
+    assert all(len(set(w)) == 12 for w in windows)
+    uses = Counter(i for w in windows for i in w)
+    assert set(uses) == set(range(20))
+    assert max(uses.values()) - min(uses.values()) <= 1
+
+
+def test_split_empty_pool():
+    assert main.split_candidates_across_days([]) == [[] for _ in range(7)]
+
+
+def test_find_repeated_days_flags_later_day_only():
+    week = {
+        1: _day("Vegetable Poha"),
+        2: _day("  vegetable   POHA "),
+        3: _day("Ragi Dosa"),
+        4: _day("2 Multigrain Rotis with Palak Paneer"),
+        5: _day("Palak Paneer with 2 Rotis"),
+    }
+    assert main.find_repeated_days(week) == {2: ["  vegetable   POHA "], 5: ["Palak Paneer with 2 Rotis"]}
+
+
+def test_find_repeated_days_keeps_distinct_dishes():
+    week = {1: _day("Paneer Tikka"), 2: _day("Palak Paneer"), 3: _day("Moong Dal Khichdi"), 4: _day("Moong Dal Chilla")}
+    assert main.find_repeated_days(week) == {}
+
+
+def _stub_days(monkeypatch, first_round, repair):
+    calls = []
+
+    def fake_single_day(profile, insights, candidates, prefs, day_number, previous_items=None):
+        calls.append((day_number, previous_items))
+        if previous_items is None:
+            return first_round[day_number]
+        return repair(day_number)
+
+    monkeypatch.setattr(main, "generate_single_day_plan", fake_single_day)
+    return calls
+
+
+DISHES = ["Idli Sambhar", "Vegetable Upma", "Methi Thepla", "Ragi Dosa", "Moong Chilla", "Oats Porridge", "Besan Cheela"]
+FIRST_ROUND = {d: _day(DISHES[d - 1]) for d in range(1, 8)}
+FIRST_ROUND[5] = _day("Vegetable Upma")
+
+
+def test_structured_plan_repairs_only_colliding_days(monkeypatch):
+    calls = _stub_days(monkeypatch, FIRST_ROUND, lambda d: _day("Fresh Sprout Salad"))
+    plan = main.generate_structured_plan({"name": "t"}, {"conditions": []}, list(range(40))).to_dict(0)
+
+    assert len(calls) == 8
+    assert [d for d, prev in calls if prev is not None] == [5]
+    assert plan["week_plan"]["day5"]["breakfast"][0]["item"] == "Fresh Sprout Salad"
+
+
+def test_structured_plan_keeps_original_when_repair_fails(monkeypatch):
+    def boom(day_number):
+        raise RuntimeError("429")
+
+    _stub_days(monkeypatch, FIRST_ROUND, boom)
+    plan = main.generate_structured_plan({"name": "t"}, {"conditions": []}, list(range(40))).to_dict(0)
+    assert plan["week_plan"]["day5"]["breakfast"][0]["item"] == "Vegetable Upma"
+
+
+def test_structured_plan_rechecks_concurrent_repairs(monkeypatch):
+    first_round = {d: _day(DISHES[d - 1]) for d in range(1, 8)}
+    first_round[4] = _day("Idli Sambhar")
+    first_round[6] = _day("Methi Thepla")
+    # Both repaired days independently pick the same new dish
+    _stub_days(monkeypatch, first_round, lambda d: _day("Fresh Sprout Salad"))
+    plan = main.generate_structured_plan({"name": "t"}, {"conditions": []}, list(range(40)))
+
+    week = plan.to_dict(0)["week_plan"]
+    assert week["day4"]["breakfast"][0]["item"] == "Fresh Sprout Salad"
+    # Day 6's repair now repeats day 4's; its first-round version repeats just as much, so the
+    # repaired one is kept and the residual repeat is logged rather than silently ignored
+    assert main.find_repeated_days({int(k[3:]): v for k, v in week.items()}) == {6: ["Fresh Sprout Salad"]}
+
+
+def test_structured_plan_reverts_repair_that_repeats_more(monkeypatch):
+    first_round = {d: _day(DISHES[d - 1]) for d in range(1, 8)}
+    first_round[4] = _day("Idli Sambhar")
+    first_round[6] = _day("Methi Thepla")
+    repairs = {4: _day("Fresh Sprout Salad"), 6: _day("Fresh Sprout Salad", "Vegetable Upma")}
+    _stub_days(monkeypatch, first_round, lambda d: repairs[d])
+    week = main.generate_structured_plan({"name": "t"}, {"conditions": []}, list(range(40))).to_dict(0)["week_plan"]
+
+    assert week["day4"]["breakfast"][0]["item"] == "Fresh Sprout Salad"
+    # Day 6's repair repeats two dishes, its first-round version only one
+    assert [d["item"] for d in week["day6"]["breakfast"]] == ["Methi Thepla"]
@@ -0,0 +1,52 @@
+# tests/test_risk_cache.py
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+for _dep in ("tensorflow", "fastapi", "pdfplumber", "pdf2image", "pytesseract", "google.genai"):
+    pytest.importorskip(_dep)
+
+import main
+
+
+def _params(**values):
+    return {key: {"value": str(val)} for key, val in values.items()}
+
+
+@pytest.mark.parametrize("params", [
+    _params(Glucose=126.4, Creatinine=1.0),
+    _params(Glucose=126.0, Creatinine=1.0),
+    _params(Glucose=100, Creatinine=1.204),
+    _params(Glucose=100, Creatinine=1.2),
+    _params(Glucose=100, Creatinine=1.0, HbA1c=6.54),
+    _params(Glucose=100, Creatinine=1.0, HbA1c=6.5),
+    _params(Glucose=100, Creatinine=1.0, MAP=100.4),
+    _params(Glucose=100, Creatinine=1.0, MAP=100),
+    _params(Glucose=140.2, Creatinine=0.934),
+])
+def test_quantization_keeps_threshold_rules(params):
+    cached = main.assess_patient(params)
+    _, vitals = main.build_feature_vector(params)
+    # Same risk score, raw (unquantized) biomarkers
+    raw = main.build_clinical_json(cached["patient_metrics"]["mortality_risk"], vitals, params)
+    for key in ("conditions", "avoid", "recommend", "summary"):
+        assert cached[key] == raw[key]
+    # Reported lab values are the patient's own, not the quantized cache key
+    assert cached["patient_metrics"]["glucose"] == raw["patient_metrics"]["glucose"] == vitals["Glucose"]
+    assert cached["patient_metrics"]["creatinine"] == raw["patient_metrics"]["creatinine"] == vitals["Creatinine"]
+
+
+def test_cache_hit_skips_tensor_build(monkeypatch):
+    params = _params(Glucose=141.3, Creatinine=0.93, HbA1c=7.1)
+    main.assess_patient(params)
+
+    calls = []
+    monkeypatch.setattr(main, "to_input_tensor", lambda vector: calls.append(vector))
+    hits = main.RISK_CACHE.hits
+    clinical = main.assess_patient(_params(Glucose=141.1, Creatinine=0.93, HbA1c=7.1))  # same bucket
+    assert main.RISK_CACHE.hits == hits + 1
+    assert clinical["patient_metrics"]["glucose"] == 141.1
+    assert calls == []
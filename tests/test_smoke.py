@@ -0,0 +1,55 @@
+# tests/test_smoke.py
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from plan_table import WeekPlan, MEAL_TYPES, NUTRIENTS
+
+
+SAMPLE_REPORT = """
+Age / Gender : 58 years / Male
+Glucose fasting 146 mg/dL
+Creatinine, Serum 1.45 mg/dL
+UREA 38 mg/dL
+SODIUM 139 mmol/L
+POTASSIUM 4.6 mmol/L
+Haemoglobin 13.20 g/dL
+Cholesterol-Total 212 mg/dL
+Glyco Hb (HbA1C) 7.10 %
+"""
+
+
+def test_extract_then_preprocess():
+    for dep in ("tensorflow", "fastapi", "pdfplumber", "pdf2image", "pytesseract", "google.genai"):
+        pytest.importorskip(dep)
+    import main
+
+    params = main.extract_all_parameters(SAMPLE_REPORT)
+    assert all(isinstance(v, dict) for v in params.values())
+    assert params["Glucose"]["value"] == "146"
+
+    input_tensor, vitals = main.preprocess_patient_data(params)
+    assert input_tensor.shape == (1, 24, len(main.MODEL_FEATURES))
+    assert vitals["Glucose"] == 146.0
+    assert vitals["Creatinine"] == 1.45
+
+
+def test_week_plan_to_dict():
+    day = {
+        "breakfast": [{"item": "Vegetable Poha", "calories": 250.4, "protein": "6", "fat": 5, "carbs": 40, "tags": []}],
+        "lunch": [{"item": "Dal with 2 Rotis", "calories": 480, "protein": 18, "fat": 9, "carbs": None, "tags": ["renal_safe"]}],
+        "dinner": [{"calories": 100}],  # unnamed dish is dropped
+        "snacks": [],
+    }
+    out = WeekPlan.from_days([day] * 7, "reasoning").to_dict(0)
+
+    assert list(out["week_plan"]) == [f"day{d}" for d in range(1, 8)]
+    assert list(out["week_plan"]["day1"]) == list(MEAL_TYPES)
+    assert out["week_plan"]["day3"]["dinner"] == []
+    assert out["week_plan"]["day1"]["breakfast"][0]["calories"] == 250.0
+    assert out["total_nutrition"] == {"calories": 730.0, "protein": 24.0, "fat": 14.0, "carbs": 40.0}
+    assert set(out["daily_nutrition"]["day7"]["meals"]["lunch"]) == set(NUTRIENTS)
+    assert out["medical_reasoning"] == "reasoning"